@@ -2,16 +2,18 @@
 
 from __future__ import annotations
 
-from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+from urllib.parse import parse_qs, unquote_plus, urlencode, urlsplit, urlunsplit
 
 import httpx
 
 DEFAULT_CODEX_CALLBACK_URL: str = "http://127.0.0.1:1455/auth/callback"
 
+_CALLBACK_QUERY_KEYS: frozenset[str] = frozenset({"code", "state", "error", "error_description"})
+
 
 def extract_expected_redirect_uri(auth_url: str) -> str | None:
     """Extract the redirect_uri parameter from an OAuth auth URL."""
-    parsed = urlparse(auth_url)
+    parsed = urlsplit(auth_url)
     if parsed.scheme not in {"http", "https"}:
         return None
 
@@ -24,7 +26,7 @@ def extract_expected_redirect_uri(auth_url: str) -> str | None:
     if not redirect_uri:
         return None
 
-    target = urlparse(redirect_uri)
+    target = urlsplit(redirect_uri)
     if target.scheme not in {"http", "https"} or not target.netloc:
         return None
 
@@ -37,38 +39,58 @@ def build_callback_replay_url(expected_redirect_uri: str | None, callback_url: s
     Raises ValueError if the callback URL is invalid or missing required parameters.
     """
     raw = callback_url.strip()
-    parsed_callback = urlparse(raw)
+    parsed_callback = urlsplit(raw)
 
     if parsed_callback.scheme not in {"http", "https"} or not parsed_callback.netloc:
         raise ValueError("Invalid callback URL. Paste the full redirect URL from your browser.")
 
-    callback_query = parse_qs(parsed_callback.query)
-    has_success = "code" in callback_query and "state" in callback_query
-    has_error = "error" in callback_query and "state" in callback_query
+    filtered_query: list[tuple[str, str]] = []
+    for pair in parsed_callback.query.split("&"):
+        raw_key, _, raw_value = pair.partition("=")
+        key = unquote_plus(raw_key)
+        if key not in _CALLBACK_QUERY_KEYS:
+            continue
+        value = unquote_plus(raw_value)
+        if value:
+            filtered_query.append((key, value))
+
+    present_keys = {key for key, _ in filtered_query}
+    has_success = "code" in present_keys and "state" in present_keys
+    has_error = "error" in present_keys and "state" in present_keys
 
     if not has_success and not has_error:
         raise ValueError("Callback URL is missing required auth parameters.")
 
-    destination = urlparse(expected_redirect_uri or DEFAULT_CODEX_CALLBACK_URL)
+    destination = urlsplit(expected_redirect_uri or DEFAULT_CODEX_CALLBACK_URL)
     if destination.scheme not in {"http", "https"} or not destination.netloc:
         raise ValueError("Stored callback destination is invalid. Run /auth login again.")
 
-    filtered_query: list[tuple[str, str]] = []
-    for key in ("code", "state", "error", "error_description"):
-        values = callback_query.get(key)
-        if not values:
-            continue
-        for value in values:
-            filtered_query.append((key, value))
-
-    query = urlencode(filtered_query, doseq=True)
+    query = urlencode(filtered_query)
     path = destination.path or "/auth/callback"
-    return urlunparse((destination.scheme, destination.netloc, path, "", query, ""))
+    return urlunsplit((destination.scheme, destination.netloc, path, query, ""))
+
+
+_replay_client: httpx.AsyncClient | None = None
+
+
+def _get_replay_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client used to replay callbacks, creating it on first use."""
+    global _replay_client
+    if _replay_client is None or _replay_client.is_closed:
+        _replay_client = httpx.AsyncClient(timeout=15)
+    return _replay_client
 
 
 async def replay_callback_to_codex(replay_url: str) -> None:
     """Replay the OAuth callback to Codex's local callback endpoint."""
-    async with httpx.AsyncClient(timeout=15) as client:
-        response = await client.get(replay_url, follow_redirects=False)
-        if response.status_code >= 400:
-            response.raise_for_status()
+    response = await _get_replay_client().get(replay_url, follow_redirects=False)
+    if response.status_code >= 400:
+        response.raise_for_status()
+
+
+async def close_replay_client() -> None:
+    """Close the shared callback replay HTTP client."""
+    global _replay_client
+    if _replay_client is not None:
+        await _replay_client.aclose()
+        _replay_client = None
@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 import logging
-import os
 from pathlib import Path
 from typing import Any
 
@@ -36,7 +35,7 @@ class CodexAppServerClient:
         cwd: str | None,
     ) -> None:
         self._model = model
-        self._cwd = cwd
+        self._cwd = str(Path(cwd)) if cwd else None
 
         self._client = AsyncCodexClient(
             codex_bin=codex_bin,
@@ -44,7 +43,6 @@ class CodexAppServerClient:
             client_title="Codex WhatsApp Agent",
             client_version="0.1.0",
             experimental_api=True,
-            env=os.environ.copy(),
         )
         self._started = False
 
@@ -73,7 +71,7 @@ class CodexAppServerClient:
         params = ThreadStartParams(
             model=self._model,
             approval_policy=ApprovalPolicySimple.NEVER,
-            cwd=str(Path(self._cwd)) if self._cwd else None,
+            cwd=self._cwd,
         )
         result = await self._client.thread_start(params)
         thread_dict: dict[str, Any] = result.thread.model_dump(by_alias=True, exclude_none=True)
@@ -91,12 +89,12 @@ class CodexAppServerClient:
         result = await self._client.thread_resume(
             ThreadResumeParams(thread_id=thread_id, approval_policy=ApprovalPolicySimple.NEVER)
         )
-        return dict(result.thread.model_dump(by_alias=True, exclude_none=True))
+        return result.thread.model_dump(by_alias=True, exclude_none=True)
 
     async def thread_list(self, limit: int = 10) -> list[dict[str, Any]]:
         """List recent threads."""
         result = await self._client.thread_list(ThreadListParams(cursor=None, limit=limit, sort_key="updated_at"))
-        return [dict(thread.model_dump(by_alias=True, exclude_none=True)) for thread in result.data]
+        return [thread.model_dump(by_alias=True, exclude_none=True) for thread in result.data]
 
     async def thread_compact_start(self, thread_id: str) -> None:
         """Start compaction for a thread."""
@@ -106,7 +104,7 @@ class CodexAppServerClient:
     async def account_read(self, refresh_token: bool = False) -> dict[str, Any]:
         """Read account information."""
         result = await self._client.account_read(refresh_token=refresh_token)
-        return dict(result.model_dump(by_alias=True, exclude_none=True))
+        return result.model_dump(by_alias=True, exclude_none=True)
 
     async def account_login_start_chatgpt(self) -> dict[str, Any]:
         """Start ChatGPT login flow."""
@@ -129,8 +127,7 @@ class CodexAppServerClient:
         def on_event(method: str, event: ThreadEvent) -> EventAction | None:
             nonlocal blocked_item_type
             if isinstance(event, ItemCompletedEvent):
-                item = event.item if isinstance(event.item, dict) else {}
-                item_type = item.get("type")
+                item_type = event.item.get("type") if isinstance(event.item, dict) else None
                 if isinstance(item_type, str) and not is_allowed_item_type(item_type):
                     blocked_item_type = item_type
                     return EventAction.INTERRUPT
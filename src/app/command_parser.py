@@ -2,16 +2,20 @@
 
 from __future__ import annotations
 
-from pydantic import BaseModel, ConfigDict
+from dataclasses import dataclass
 
 
-class SlashCommand(BaseModel):
-    """Parsed slash command."""
+@dataclass(frozen=True, slots=True)
+class SlashCommand:
+    """Parsed slash command.
 
-    model_config = ConfigDict(extra="forbid")
+    ``subcommand`` is the lowercased first word of ``args`` and ``rest`` is whatever follows it.
+    """
 
     name: str
     args: str
+    subcommand: str = ""
+    rest: str = ""
 
 
 def parse_slash_command(text: str) -> SlashCommand | None:
@@ -20,14 +24,18 @@ def parse_slash_command(text: str) -> SlashCommand | None:
     Returns None if the text is not a slash command.
     """
     raw = text.strip()
-    if not raw.startswith("/"):
+    if raw[:1] != "/":
         return None
 
-    body = raw[1:]
-    if not body:
+    parts = raw[1:].split(maxsplit=1)
+    if not parts:
         return None
 
-    parts = body.split(maxsplit=1)
     name = parts[0].lower()
-    args = parts[1].strip() if len(parts) > 1 else ""
-    return SlashCommand(name=name, args=args)
+    if len(parts) == 1:
+        return SlashCommand(name=name, args="")
+
+    args = parts[1]
+    sub_parts = args.split(maxsplit=1)
+    rest = sub_parts[1] if len(sub_parts) > 1 else ""
+    return SlashCommand(name=name, args=args, subcommand=sub_parts[0].lower(), rest=rest)
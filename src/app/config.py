@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-from functools import lru_cache
 from pathlib import Path
 
 from pydantic import Field
@@ -38,7 +37,18 @@ class Settings(BaseSettings):
     database_path: Path = Field(default=Path("data/state.db"), alias="DATABASE_PATH")
 
 
-@lru_cache(maxsize=1)
+_settings: Settings | None = None
+
+
 def get_settings() -> Settings:
-    """Get cached application settings."""
-    return Settings()
+    """Get application settings, loading them from the environment on first use."""
+    if _settings is None:
+        return reload_settings()
+    return _settings
+
+
+def reload_settings() -> Settings:
+    """Reload application settings from the environment."""
+    global _settings
+    _settings = Settings()
+    return _settings
@@ -3,15 +3,23 @@
 from __future__ import annotations
 
 import asyncio
+import hmac
 import logging
 import re
-from collections import defaultdict
+from collections import OrderedDict
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
+from functools import lru_cache
+from itertools import islice
+from typing import Any
 
-from fastapi import FastAPI, Header, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 
+from app.auth_relay import close_replay_client
 from app.codex_client import CodexAppServerClient
+from app.command_parser import parse_slash_command
 from app.config import Settings, get_settings
 from app.models import HealthResponse, InboundAcceptedResponse, InboundMessage
 from app.service import ChatService
@@ -23,6 +31,10 @@ logger = logging.getLogger(__name__)
 
 _SELF_CHAT_MODE = "self_chat"
 _APPROVED_SENDERS_MODE = "approved_senders"
+_MAX_CHAT_LOCKS = 4096
+_MAX_INBOUND_BATCH = 8
+_NON_DIGIT_RE = re.compile(r"\D")
+_ASCII_NON_DIGIT_DELETE = str.maketrans("", "", "".join(chr(c) for c in range(128) if not chr(c).isdigit()))
 
 
 class _Container:
@@ -43,11 +55,58 @@ class _Container:
             shared_secret=settings.sidecar_shared_secret,
         )
         self.service = ChatService(store=self.store, codex=self.codex)
-        self.chat_locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self.chat_locks: OrderedDict[str, asyncio.Lock] = OrderedDict()
+        self.chat_inflight: dict[str, int] = {}
+        self.pending_inbound: dict[str, list[tuple[str, str]]] = {}
+        self._self_identity_cache: tuple[str, str] | None = None
         self.approved_sender_identities = _parse_approved_sender_identities(settings.whatsapp_approved_numbers)
         if self.whatsapp_access_mode == _APPROVED_SENDERS_MODE and not self.approved_sender_identities:
             logger.warning("No approved WhatsApp senders configured; inbound messages will be ignored")
 
+    def self_identity(self, self_jid: str) -> str:
+        """Get the identity of the account's own JID, memoized in a single slot."""
+        cached = self._self_identity_cache
+        if cached is not None and cached[0] == self_jid:
+            return cached[1]
+        identity = _jid_identity(self_jid)
+        self._self_identity_cache = (self_jid, identity)
+        return identity
+
+    def get_chat_lock(self, chat_key: str) -> asyncio.Lock:
+        """Get the per-chat lock, evicting least recently used idle locks."""
+        lock = self.chat_locks.get(chat_key)
+        if lock is not None:
+            self.chat_locks.move_to_end(chat_key)
+            return lock
+
+        lock = asyncio.Lock()
+        self.chat_locks[chat_key] = lock
+        excess = len(self.chat_locks) - _MAX_CHAT_LOCKS
+        if excess > 0:
+            idle = (key for key in self.chat_locks if key != chat_key and key not in self.chat_inflight)
+            for key in list(islice(idle, excess)):
+                del self.chat_locks[key]
+        return lock
+
+    @asynccontextmanager
+    async def chat_turn(self, chat_key: str) -> AsyncIterator[None]:
+        """Hold the chat's lock, keeping it from eviction while this task holds or waits on it.
+
+        A released lock reports unlocked before its woken waiter runs, so ``locked()``
+        alone cannot tell whether a lock is still in use.
+        """
+        lock = self.get_chat_lock(chat_key)
+        self.chat_inflight[chat_key] = self.chat_inflight.get(chat_key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            remaining = self.chat_inflight[chat_key] - 1
+            if remaining:
+                self.chat_inflight[chat_key] = remaining
+            else:
+                del self.chat_inflight[chat_key]
+
 
 @asynccontextmanager
 async def lifespan(_: FastAPI) -> AsyncIterator[None]:
@@ -56,47 +115,85 @@ async def lifespan(_: FastAPI) -> AsyncIterator[None]:
     container = _Container(settings)
     app.state.container = container
     await container.store.init()
-    await container.codex.start()
+    try:
+        await container.codex.start()
+    except BaseException:
+        # The store's connection thread is not a daemon; leaving it open keeps the process alive.
+        await container.store.close()
+        raise
     logger.info("Application started")
     try:
         yield
     finally:
         await container.sidecar.close()
+        await close_replay_client()
+        await container.store.close()
         await container.codex.close()
         logger.info("Application stopped")
 
 
 app = FastAPI(lifespan=lifespan)
 
+_HEALTH_OK_BODY = HealthResponse(status="ok").model_dump_json().encode()
+_INBOUND_ACCEPTED_BODY = InboundAcceptedResponse(accepted=True).model_dump_json().encode()
 
-@app.get("/health")
-async def health() -> HealthResponse:
+
+@app.get("/health", response_model=HealthResponse)
+async def health() -> Response:
     """Health check endpoint."""
-    return HealthResponse(status="ok")
+    return Response(content=_HEALTH_OK_BODY, media_type="application/json")
+
 
+_INBOUND_OPENAPI_EXTRA = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": InboundMessage.model_json_schema(by_alias=True)}},
+    }
+}
 
-@app.post("/whatsapp/inbound")
+
+@app.post("/whatsapp/inbound", response_model=InboundAcceptedResponse, openapi_extra=_INBOUND_OPENAPI_EXTRA)
 async def whatsapp_inbound(
-    payload: InboundMessage,
+    request: Request,
     x_sidecar_secret: str | None = Header(default=None),
-) -> InboundAcceptedResponse:
-    """Handle inbound WhatsApp message from sidecar."""
+) -> Response:
+    """Handle inbound WhatsApp message from sidecar.
+
+    The body is validated straight from raw JSON bytes, skipping the intermediate
+    dict FastAPI would build, and only after the sidecar secret has been checked.
+    """
     container: _Container = app.state.container
     expected = container.settings.sidecar_shared_secret
 
-    if expected and x_sidecar_secret != expected:
+    if expected and not hmac.compare_digest((x_sidecar_secret or "").encode(), expected.encode()):
         raise HTTPException(status_code=401, detail="Invalid sidecar secret")
 
+    body = await request.body()
+    try:
+        if _is_json_content_type(request.headers.get("content-type")):
+            payload = InboundMessage.model_validate_json(body)
+        else:
+            # FastAPI validates non-JSON bodies as raw text, which fails as a non-object.
+            payload = InboundMessage.model_validate(body.decode(errors="replace"), from_attributes=True)
+    except ValidationError as exc:
+        raise RequestValidationError(_body_validation_errors(exc)) from exc
+
     asyncio.create_task(_process_inbound(payload, container))
-    return InboundAcceptedResponse(accepted=True)
+    return Response(content=_INBOUND_ACCEPTED_BODY, media_type="application/json")
 
 
 async def _process_inbound(payload: InboundMessage, container: _Container) -> None:
     """Process an inbound message asynchronously."""
+    self_identity = (
+        container.self_identity(payload.self_jid)
+        if container.whatsapp_access_mode == _SELF_CHAT_MODE and payload.self_jid and not payload.is_group
+        else None
+    )
     allowed = _should_process_inbound(
         payload,
         access_mode=container.whatsapp_access_mode,
         approved_sender_identities=container.approved_sender_identities,
+        self_identity=self_identity,
     )
     if not allowed:
         logger.info(
@@ -116,8 +213,8 @@ async def _process_inbound(payload: InboundMessage, container: _Container) -> No
     if (
         container.whatsapp_access_mode == _SELF_CHAT_MODE
         and payload.from_identity
-        and payload.self_jid
-        and _jid_identity(payload.from_identity) == _jid_identity(payload.self_jid)
+        and self_identity is not None
+        and _jid_identity(payload.from_identity) == self_identity
     ):
         reply_to = payload.from_identity
 
@@ -130,13 +227,15 @@ async def _process_inbound(payload: InboundMessage, container: _Container) -> No
         reply_to,
     )
 
-    lock = container.chat_locks[chat_key]
-    async with lock:
+    container.pending_inbound.setdefault(chat_key, []).append((reply_to, payload.text))
+    async with container.chat_turn(chat_key):
+        batch = _take_inbound_batch(container.pending_inbound, chat_key)
+        if batch is None:
+            return
+        reply_to, text = batch
         try:
-            response = await container.service.handle_message(chat_key, payload.text)
-            chunks = _chunk_text(response.text)
-            for chunk in chunks:
-                await container.sidecar.send_text(reply_to, chunk)
+            response = await container.service.handle_message(chat_key, text)
+            await container.sidecar.send_texts(reply_to, _chunk_text(response.text))
         except Exception:
             logger.exception("Failed to handle inbound message")
             try:
@@ -148,6 +247,52 @@ async def _process_inbound(payload: InboundMessage, container: _Container) -> No
                 logger.exception("Failed to send error message to WhatsApp")
 
 
+def _is_json_content_type(value: str | None) -> bool:
+    """Check whether a Content-Type header names JSON, as FastAPI does for body params."""
+    if not value:
+        return False
+    maintype, _, subtype = value.partition(";")[0].strip().lower().partition("/")
+    return maintype == "application" and (subtype == "json" or subtype.endswith("+json"))
+
+
+def _body_validation_errors(exc: ValidationError) -> list[dict[str, Any]]:
+    """Shape pydantic errors for a request body the way FastAPI reports them."""
+    errors: list[dict[str, Any]] = []
+    for error in exc.errors(include_url=False):
+        detail: dict[str, Any] = {**error, "loc": ("body", *error["loc"])}
+        if error["type"] == "json_invalid":
+            detail["input"] = {}
+        errors.append(detail)
+    return errors
+
+
+def _take_inbound_batch(pending: dict[str, list[tuple[str, str]]], chat_key: str) -> tuple[str, str] | None:
+    """Pop the next run of queued messages for a chat that can share one Codex turn.
+
+    Plain messages that queued up while the chat was busy are joined into a single
+    turn; slash commands are always handled on their own. Returns None when an
+    earlier batch already consumed everything queued for the chat.
+    """
+    queue = pending.get(chat_key)
+    if not queue:
+        return None
+
+    reply_to, text = queue[0]
+    size = 1
+    if parse_slash_command(text) is None:
+        while size < len(queue) and size < _MAX_INBOUND_BATCH:
+            next_reply_to, next_text = queue[size]
+            if next_reply_to != reply_to or parse_slash_command(next_text) is not None:
+                break
+            size += 1
+
+    texts = [queued_text for _, queued_text in queue[:size]]
+    del queue[:size]
+    if not queue:
+        del pending[chat_key]
+    return reply_to, "\n".join(texts)
+
+
 def _normalize_access_mode(value: str) -> str:
     """Normalize access mode to canonical form."""
     mode = value.strip().casefold()
@@ -163,28 +308,28 @@ def _should_process_inbound(
     *,
     access_mode: str,
     approved_sender_identities: set[str],
+    self_identity: str | None = None,
 ) -> bool:
-    """Determine if an inbound message should be processed."""
-    sender_identity = payload.from_identity or payload.from_id
+    """Determine if an inbound message should be processed.
 
+    ``self_identity`` may carry the precomputed identity of ``payload.self_jid``.
+    """
     if payload.is_group:
         return False
 
     if access_mode == _SELF_CHAT_MODE:
         if not payload.self_jid:
             return False
-        return _jid_identity(sender_identity) == _jid_identity(payload.self_jid)
+        if self_identity is None:
+            self_identity = _jid_identity(payload.self_jid)
+        return _jid_identity(payload.from_identity or payload.from_id) == self_identity
 
-    if payload.from_me:
+    if payload.from_me or access_mode != _APPROVED_SENDERS_MODE or not approved_sender_identities:
         return False
-
-    if access_mode != _APPROVED_SENDERS_MODE:
-        return False
-    if not approved_sender_identities:
-        return False
-    return _jid_identity(sender_identity) in approved_sender_identities
+    return _jid_identity(payload.from_identity or payload.from_id) in approved_sender_identities
 
 
+@lru_cache(maxsize=1024)
 def _normalize_jid(value: str) -> str:
     """Normalize a JID to canonical form."""
     clean = value.strip().casefold()
@@ -196,23 +341,27 @@ def _normalize_jid(value: str) -> str:
     return f"{local}@{domain}"
 
 
+@lru_cache(maxsize=1024)
 def _jid_identity(value: str) -> str:
     """Extract the identity (digits only) from a JID."""
     normalized = _normalize_jid(value)
     local = normalized.split("@", 1)[0]
-    digits = re.sub(r"\D", "", local)
+    if local.isascii():
+        digits = local.translate(_ASCII_NON_DIGIT_DELETE)
+    else:
+        digits = _NON_DIGIT_RE.sub("", local)
     return digits or local
 
 
-def _iter_approved_number_values(value: str | list[str] | None) -> list[str]:
+def _iter_approved_number_values(value: str | tuple[str, ...] | None) -> list[str]:
     """Iterate over approved number values, splitting on commas and newlines."""
     if value is None:
         return []
-    raw_values = value if isinstance(value, list) else [value]
+    raw_values = value if isinstance(value, tuple) else (value,)
 
     parts: list[str] = []
     for raw in raw_values:
-        for part in re.split(r"[,\n]", str(raw)):
+        for part in str(raw).replace("\n", ",").split(","):
             clean = part.strip()
             if clean:
                 parts.append(clean)
@@ -221,12 +370,14 @@ def _iter_approved_number_values(value: str | list[str] | None) -> list[str]:
 
 def _parse_approved_sender_identities(value: str | list[str] | None) -> set[str]:
     """Parse approved sender identities from config value."""
-    identities: set[str] = set()
-    for raw in _iter_approved_number_values(value):
-        if not raw:
-            continue
-        identities.add(_jid_identity(raw))
-    return identities
+    key = tuple(value) if isinstance(value, list) else value
+    return set(_parse_approved_sender_identities_cached(key))
+
+
+@lru_cache(maxsize=1)
+def _parse_approved_sender_identities_cached(value: str | tuple[str, ...] | None) -> frozenset[str]:
+    """Parse approved sender identities from a hashable config value."""
+    return frozenset(_jid_identity(raw) for raw in _iter_approved_number_values(value))
 
 
 def _chunk_text(text: str, max_chars: int = 3000) -> list[str]:
@@ -238,13 +389,17 @@ def _chunk_text(text: str, max_chars: int = 3000) -> list[str]:
         return [clean]
 
     chunks: list[str] = []
-    remaining = clean
-    while len(remaining) > max_chars:
-        split_at = remaining.rfind("\n", 0, max_chars)
-        if split_at <= 0:
-            split_at = max_chars
-        chunks.append(remaining[:split_at].strip())
-        remaining = remaining[split_at:].strip()
-    if remaining:
-        chunks.append(remaining)
+    start = 0
+    end_of_text = len(clean)
+    while end_of_text - start > max_chars:
+        limit = start + max_chars
+        split_at = clean.rfind("\n", start, limit)
+        if split_at <= start:
+            split_at = limit
+        chunks.append(clean[start:split_at].strip())
+        start = split_at
+        while start < end_of_text and clean[start].isspace():
+            start += 1
+    if start < end_of_text:
+        chunks.append(clean[start:])
     return chunks
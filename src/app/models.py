@@ -32,7 +32,7 @@ class PendingLogin(BaseModel):
 class ChatResponse(BaseModel):
     """Response from chat service."""
 
-    model_config = ConfigDict(extra="forbid")
+    model_config = ConfigDict(extra="forbid", frozen=True)
 
     text: str
 
@@ -3,6 +3,9 @@
 from __future__ import annotations
 
 import asyncio
+import re
+import time
+from collections.abc import Awaitable, Callable
 from typing import Any
 
 from app.auth_relay import (
@@ -16,6 +19,26 @@ from app.models import ChatResponse
 from app.store import SessionStore
 from app.system_prompt import RESEARCH_ONLY_SYSTEM_PROMPT
 
+_THREAD_NOT_FOUND_RE = re.compile(r"thread not found", re.IGNORECASE)
+_ACCOUNT_READ_TTL_SECONDS = 0.3
+# Clock hooks for login polling; tests replace these to run the backoff in virtual time.
+_sleep = asyncio.sleep
+_monotonic = time.monotonic
+_PREVIEW_WHITESPACE_TABLE = str.maketrans({"\n": " ", "\r": " ", "\t": " "})
+
+_HELP_RESPONSE = ChatResponse(
+    text=(
+        "Available commands:\n"
+        "/new [title]\n"
+        "/sessions [limit]\n"
+        "/resume <thread_id|index>\n"
+        "/compact [instructions]\n"
+        "/auth status|login|complete|cancel [login_id]\n"
+        "/help"
+    )
+)
+_UNKNOWN_COMMAND_RESPONSE = ChatResponse(text="Unknown command. Send /help.")
+
 
 class ChatService:
     """Service for handling chat messages and commands."""
@@ -23,6 +46,16 @@ class ChatService:
     def __init__(self, store: SessionStore, codex: CodexAppServerClient) -> None:
         self._store = store
         self._codex = codex
+        self._command_handlers: dict[str, Callable[[str, SlashCommand], Awaitable[ChatResponse]]] = {
+            "help": self._handle_help,
+            "new": self._handle_new,
+            "sessions": self._handle_sessions,
+            "resume": self._handle_resume,
+            "compact": self._handle_compact,
+            "auth": self._handle_auth_command,
+        }
+        self._account_cache: tuple[float, dict[str, Any]] | None = None
+        self._account_cache_lock = asyncio.Lock()
 
     async def handle_message(self, chat_id: str, text: str) -> ChatResponse:
         """Handle an inbound message, routing to command or turn execution."""
@@ -35,7 +68,7 @@ class ChatService:
             thread = await self._codex.thread_start()
             thread_id = thread.get("id")
             if not isinstance(thread_id, str):
-                return ChatResponse(text="Could not create a new session.")
+                return _resp("Could not create a new session.")
             await self._store.set_thread_for_chat(chat_id, thread_id)
 
         for attempt in range(2):
@@ -50,101 +83,91 @@ class ChatService:
                 if not _is_thread_not_found_error(exc):
                     raise
                 if attempt == 1:
-                    return ChatResponse(text="Session expired and could not be recovered. Send /new and try again.")
+                    return _resp("Session expired and could not be recovered. Send /new and try again.")
                 thread = await self._codex.thread_start()
                 thread_id = thread.get("id")
                 if not isinstance(thread_id, str):
-                    return ChatResponse(text="Could not create a new session.")
+                    return _resp("Could not create a new session.")
                 await self._store.set_thread_for_chat(chat_id, thread_id)
 
-        return ChatResponse(text=result.text)
+        return _resp(result.text)
 
     async def _handle_command(self, chat_id: str, command: SlashCommand) -> ChatResponse:
         """Handle a slash command."""
-        if command.name == "help":
-            return ChatResponse(
-                text=(
-                    "Available commands:\n"
-                    "/new [title]\n"
-                    "/sessions [limit]\n"
-                    "/resume <thread_id|index>\n"
-                    "/compact [instructions]\n"
-                    "/auth status|login|complete|cancel [login_id]\n"
-                    "/help"
-                )
-            )
+        handler = self._command_handlers.get(command.name)
+        if handler is None:
+            return _UNKNOWN_COMMAND_RESPONSE
+        return await handler(chat_id, command)
+
+    async def _handle_help(self, chat_id: str, command: SlashCommand) -> ChatResponse:
+        """Handle /help."""
+        return _HELP_RESPONSE
+
+    async def _handle_new(self, chat_id: str, command: SlashCommand) -> ChatResponse:
+        """Handle /new [title]."""
+        title = command.args or None
+        thread = await self._codex.thread_start(title=title)
+        thread_id = thread.get("id")
+        if not isinstance(thread_id, str):
+            return _resp("Failed to start a new session.")
+        await self._store.set_thread_for_chat(chat_id, thread_id)
+        return _resp(f"Started new session: `{thread_id}`")
+
+    async def _handle_sessions(self, chat_id: str, command: SlashCommand) -> ChatResponse:
+        """Handle /sessions [limit]."""
+        limit = _parse_limit(command.args, default=5, max_value=20)
+        threads = await self._codex.thread_list(limit=limit)
+        if not threads:
+            return _resp("No sessions found.")
+        lines = [_format_session_line(idx, thread) for idx, thread in enumerate(threads, start=1)]
+        return _resp("Sessions:\n" + "\n".join(lines))
+
+    async def _handle_resume(self, chat_id: str, command: SlashCommand) -> ChatResponse:
+        """Handle /resume <thread_id|index>."""
+        arg = command.args
+        if not arg:
+            return _resp("Usage: /resume <thread_id|index>")
+
+        resume_thread_id: str | None = None
+        try:
+            idx = int(arg)
+        except ValueError:
+            resume_thread_id = arg
+        else:
+            if idx <= 0:
+                return _resp("Index must be 1 or higher.")
+            threads = await self._codex.thread_list(limit=idx)
+            if idx > len(threads):
+                return _resp(f"Only {len(threads)} sessions available in this page.")
+            candidate = threads[idx - 1].get("id")
+            if isinstance(candidate, str):
+                resume_thread_id = candidate
+
+        if not resume_thread_id:
+            return _resp("Could not resolve a session to resume.")
+
+        await self._codex.thread_resume(resume_thread_id)
+        await self._store.set_thread_for_chat(chat_id, resume_thread_id)
+        return _resp(f"Resumed session: `{resume_thread_id}`")
+
+    async def _handle_compact(self, chat_id: str, command: SlashCommand) -> ChatResponse:
+        """Handle /compact."""
+        thread_id = await self._store.get_thread_for_chat(chat_id)
+        if not thread_id:
+            return _resp("No active session. Use /new first.")
+        await self._codex.thread_compact_start(thread_id)
+        return _resp("Compaction started for the active session.")
 
-        if command.name == "new":
-            title = command.args.strip() or None
-            thread = await self._codex.thread_start(title=title)
-            thread_id = thread.get("id")
-            if not isinstance(thread_id, str):
-                return ChatResponse(text="Failed to start a new session.")
-            await self._store.set_thread_for_chat(chat_id, thread_id)
-            return ChatResponse(text=f"Started new session: `{thread_id}`")
-
-        if command.name == "sessions":
-            limit = _parse_limit(command.args, default=5, max_value=20)
-            threads = await self._codex.thread_list(limit=limit)
-            if not threads:
-                return ChatResponse(text="No sessions found.")
-            lines = ["Sessions:"]
-            for idx, thread in enumerate(threads, start=1):
-                thread_id = thread.get("id", "unknown")
-                preview = str(thread.get("preview", "")).strip().replace("\n", " ")
-                preview_part = f" — {preview[:80]}" if preview else ""
-                lines.append(f"{idx}. `{thread_id}`{preview_part}")
-            return ChatResponse(text="\n".join(lines))
-
-        if command.name == "resume":
-            arg = command.args.strip()
-            if not arg:
-                return ChatResponse(text="Usage: /resume <thread_id|index>")
-
-            resume_thread_id: str | None = None
-            if arg.isdigit():
-                idx = int(arg)
-                if idx <= 0:
-                    return ChatResponse(text="Index must be 1 or higher.")
-                threads = await self._codex.thread_list(limit=max(20, idx))
-                if idx > len(threads):
-                    return ChatResponse(text=f"Only {len(threads)} sessions available in this page.")
-                candidate = threads[idx - 1].get("id")
-                if isinstance(candidate, str):
-                    resume_thread_id = candidate
-            else:
-                resume_thread_id = arg
-
-            if not resume_thread_id:
-                return ChatResponse(text="Could not resolve a session to resume.")
-
-            await self._codex.thread_resume(resume_thread_id)
-            await self._store.set_thread_for_chat(chat_id, resume_thread_id)
-            return ChatResponse(text=f"Resumed session: `{resume_thread_id}`")
-
-        if command.name == "compact":
-            thread_id = await self._store.get_thread_for_chat(chat_id)
-            if not thread_id:
-                return ChatResponse(text="No active session. Use /new first.")
-            await self._codex.thread_compact_start(thread_id)
-            return ChatResponse(text="Compaction started for the active session.")
-
-        if command.name == "auth":
-            return await self._handle_auth_command(command)
-
-        return ChatResponse(text="Unknown command. Send /help.")
-
-    async def _handle_auth_command(self, command: SlashCommand) -> ChatResponse:
+    async def _handle_auth_command(self, chat_id: str, command: SlashCommand) -> ChatResponse:
         """Handle /auth subcommands."""
-        args = command.args.split(maxsplit=1)
-        action = args[0].lower() if args else "status"
-        rest = args[1].strip() if len(args) > 1 else ""
+        action = command.subcommand or "status"
+        rest = command.rest
 
         if action == "status":
-            info = await self._codex.account_read(refresh_token=True)
+            info = await self._read_account()
             account = info.get("account")
             if not account:
-                return ChatResponse(text="Auth: not logged in. Run /auth login and try again.")
+                return _resp("Auth: not logged in. Run /auth login and try again.")
             account_type = account.get("type", "unknown")
             email = account.get("email")
             plan_type = account.get("planType")
@@ -154,52 +177,54 @@ class ChatService:
             if plan_type:
                 extra.append(f"plan={plan_type}")
             suffix = f" ({', '.join(extra)})" if extra else ""
-            return ChatResponse(text=f"Auth: {account_type}{suffix}")
+            return _resp(f"Auth: {account_type}{suffix}")
 
         if action == "login":
+            self._account_cache = None
             result = await self._codex.account_login_start_chatgpt()
             login_id = result.get("loginId")
             auth_url = result.get("authUrl")
             if not isinstance(login_id, str) or not isinstance(auth_url, str):
-                return ChatResponse(text="Login started but auth details were incomplete.")
+                return _resp("Login started but auth details were incomplete.")
 
             await self._store.set_pending_login(
                 login_id=login_id,
                 auth_url=auth_url,
                 expected_redirect_uri=extract_expected_redirect_uri(auth_url),
             )
-            return ChatResponse(
-                text=(
-                    "1) Open this URL and sign in: "
-                    f"{auth_url}\n"
-                    "2) Copy the final browser redirect URL and send: "
-                    "/auth complete <full_url>"
-                )
+            return _resp(
+                "1) Open this URL and sign in: "
+                f"{auth_url}\n"
+                "2) Copy the final browser redirect URL and send: "
+                "/auth complete <full_url>"
             )
 
         if action == "complete":
             callback_url = rest
             if not callback_url:
-                return ChatResponse(text="Usage: /auth complete <full_url>")
+                return _resp("Usage: /auth complete <full_url>")
 
             pending = await self._store.get_pending_login()
             if not pending:
-                return ChatResponse(text="No pending login found. Run /auth login first.")
+                return _resp("No pending login found. Run /auth login first.")
 
             try:
                 replay_url = build_callback_replay_url(pending.expected_redirect_uri, callback_url)
             except ValueError as exc:
-                return ChatResponse(text=str(exc))
+                return _resp(str(exc))
 
             try:
                 await replay_callback_to_codex(replay_url)
             except Exception:
-                return ChatResponse(text="Could not complete login from that callback URL. Try /auth login again.")
+                return _resp("Could not complete login from that callback URL. Try /auth login again.")
 
+            # Restart must finish before polling: the SDK's restart cancels every in-flight
+            # request, so overlapping it with account reads would surface CancelledError.
+            self._account_cache = None
             try:
                 await self._codex.restart()
             except Exception:
-                return ChatResponse(text="Callback relayed; auth may be delayed, run /auth status in 10-20s.")
+                return _resp("Callback relayed; auth may be delayed, run /auth status in 10-20s.")
 
             account = await self._wait_for_chatgpt_login()
             if account:
@@ -212,55 +237,79 @@ class ChatService:
                 if plan_type:
                     details.append(f"plan={plan_type}")
                 suffix = f" ({', '.join(details)})" if details else ""
-                return ChatResponse(text=f"Sign-in completed: chatgpt{suffix}")
+                return _resp(f"Sign-in completed: chatgpt{suffix}")
 
-            return ChatResponse(text="Callback relayed; auth may be delayed, run /auth status in 10-20s.")
+            return _resp("Callback relayed; auth may be delayed, run /auth status in 10-20s.")
 
         if action == "apikey":
-            return ChatResponse(text="API key via WhatsApp is disabled. Use OPENAI_API_KEY env var.")
+            return _resp("API key via WhatsApp is disabled. Use OPENAI_API_KEY env var.")
 
         if action == "cancel":
             pending = await self._store.get_pending_login()
             login_id = rest or (pending.login_id if pending else None)
             if not login_id:
-                return ChatResponse(text="No pending login id found. Use /auth login first.")
+                return _resp("No pending login id found. Use /auth login first.")
+            self._account_cache = None
             await self._codex.account_login_cancel(login_id)
             await self._store.clear_pending_login()
-            return ChatResponse(text=f"Cancelled login: {login_id}")
+            return _resp(f"Cancelled login: {login_id}")
+
+        return _resp("Usage: /auth status|login|complete|cancel [login_id]")
 
-        return ChatResponse(text="Usage: /auth status|login|complete|cancel [login_id]")
+    async def _read_account(self) -> dict[str, Any]:
+        """Read account info, sharing a result fetched within the last few hundred milliseconds."""
+        async with self._account_cache_lock:
+            cached = self._account_cache
+            if cached is not None and _monotonic() - cached[0] < _ACCOUNT_READ_TTL_SECONDS:
+                return cached[1]
+            info = await self._codex.account_read(refresh_token=True)
+            self._account_cache = (_monotonic(), info)
+            return info
 
     async def _wait_for_chatgpt_login(
         self,
         timeout_seconds: float = 12,
-        interval_seconds: float = 0.6,
+        initial_interval_seconds: float = 0.3,
+        max_interval_seconds: float = 2.0,
     ) -> dict[str, Any] | None:
-        """Poll for ChatGPT login completion."""
+        """Poll for ChatGPT login completion, backing off between attempts."""
         elapsed = 0.0
+        interval = initial_interval_seconds
         while elapsed <= timeout_seconds:
-            info = await self._codex.account_read(refresh_token=True)
+            info = await self._read_account()
             account = info.get("account")
             if isinstance(account, dict) and account.get("type") == "chatgpt":
                 return account
 
-            await asyncio.sleep(interval_seconds)
-            elapsed += interval_seconds
+            await _sleep(interval)
+            elapsed += interval
+            interval = min(interval * 1.6, max_interval_seconds)
         return None
 
 
+def _resp(text: str) -> ChatResponse:
+    """Build a ChatResponse from service-generated text without re-validating it."""
+    return ChatResponse.model_construct(text=text)
+
+
 def _parse_limit(raw: str, default: int, max_value: int) -> int:
     """Parse a limit argument with bounds checking."""
-    value = raw.strip()
-    if not value:
-        return default
-    if not value.isdigit():
+    try:
+        parsed = int(raw)
+    except ValueError:
         return default
-    parsed = int(value)
     if parsed <= 0:
         return default
     return min(parsed, max_value)
 
 
+def _format_session_line(idx: int, thread: dict[str, Any]) -> str:
+    """Format one /sessions row with a single-line preview."""
+    preview = str(thread.get("preview", "")).translate(_PREVIEW_WHITESPACE_TABLE).strip()[:80]
+    preview_part = f" — {preview}" if preview else ""
+    return f"{idx}. `{thread.get('id', 'unknown')}`{preview_part}"
+
+
 def _is_thread_not_found_error(error: RuntimeError) -> bool:
     """Check if an error is a 'thread not found' error."""
-    return "thread not found" in str(error).lower()
+    return _THREAD_NOT_FOUND_RE.search(str(error)) is not None
@@ -3,82 +3,125 @@
 from __future__ import annotations
 
 import time
+from collections import OrderedDict
 from pathlib import Path
 
 import aiosqlite
 
 from app.models import PendingLogin
 
+_MAX_CACHED_THREADS = 4096
+_MEMORY_DATABASE = ":memory:"
+
+_SCHEMA_SCRIPT = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA busy_timeout=5000;
+PRAGMA temp_store=MEMORY;
+PRAGMA foreign_keys=ON;
+BEGIN;
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    chat_id TEXT PRIMARY KEY,
+    thread_id TEXT NOT NULL,
+    updated_at INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS auth_login_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    login_id TEXT,
+    auth_url TEXT,
+    expected_redirect_uri TEXT,
+    updated_at INTEGER NOT NULL
+);
+COMMIT;
+"""
+
 
 class SessionStore:
     """SQLite-backed storage for chat sessions and auth state."""
 
-    def __init__(self, path: Path) -> None:
+    def __init__(self, path: Path | str) -> None:
         self._path = path
+        self._db: aiosqlite.Connection | None = None
+        self._thread_cache: OrderedDict[str, str] = OrderedDict()
+        self._pending_login: PendingLogin | None = None
 
     async def init(self) -> None:
-        """Initialize database schema."""
-        self._path.parent.mkdir(parents=True, exist_ok=True)
-        async with aiosqlite.connect(self._path) as db:
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS chat_sessions (
-                    chat_id TEXT PRIMARY KEY,
-                    thread_id TEXT NOT NULL,
-                    updated_at INTEGER NOT NULL
-                )
-                """
-            )
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS auth_login_state (
-                    id INTEGER PRIMARY KEY CHECK (id = 1),
-                    login_id TEXT,
-                    auth_url TEXT,
-                    expected_redirect_uri TEXT,
-                    updated_at INTEGER NOT NULL
-                )
-                """
-            )
-            await self._ensure_auth_login_columns(db)
-            await db.commit()
+        """Open the database connection and initialize the schema."""
+        if self._db is not None:
+            return
+        if self._path != _MEMORY_DATABASE:
+            Path(self._path).parent.mkdir(parents=True, exist_ok=True)
+        db = await aiosqlite.connect(self._path, isolation_level=None)
+        self._db = db
+        await db.executescript(_SCHEMA_SCRIPT)
+        await self._ensure_auth_login_columns(db)
+        self._pending_login = await self._load_pending_login(db)
+
+    async def close(self) -> None:
+        """Close the database connection."""
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    def _connection(self) -> aiosqlite.Connection:
+        """Get the open database connection."""
+        if self._db is None:
+            raise RuntimeError("SessionStore.init() must be called before use")
+        return self._db
 
     async def _ensure_auth_login_columns(self, db: aiosqlite.Connection) -> None:
         """Ensure auth_login_state table has all required columns."""
-        cursor = await db.execute("PRAGMA table_info(auth_login_state)")
-        rows = await cursor.fetchall()
+        rows = await db.execute_fetchall("PRAGMA table_info(auth_login_state)")
         columns = {row[1] for row in rows}
 
-        if "auth_url" not in columns:
-            await db.execute("ALTER TABLE auth_login_state ADD COLUMN auth_url TEXT")
-        if "expected_redirect_uri" not in columns:
-            await db.execute("ALTER TABLE auth_login_state ADD COLUMN expected_redirect_uri TEXT")
+        missing = [
+            f"ALTER TABLE auth_login_state ADD COLUMN {column} TEXT;"
+            for column in ("auth_url", "expected_redirect_uri")
+            if column not in columns
+        ]
+        if missing:
+            await db.executescript("BEGIN;\n" + "\n".join(missing) + "\nCOMMIT;")
 
     async def get_thread_for_chat(self, chat_id: str) -> str | None:
         """Get the thread ID for a chat, or None if not found."""
-        async with aiosqlite.connect(self._path) as db:
-            cursor = await db.execute(
-                "SELECT thread_id FROM chat_sessions WHERE chat_id = ?",
-                (chat_id,),
-            )
-            row = await cursor.fetchone()
-            return str(row[0]) if row else None
+        thread_id = self._thread_cache.get(chat_id)
+        if thread_id is not None:
+            self._thread_cache.move_to_end(chat_id)
+            return thread_id
+
+        db = self._connection()
+        rows = await db.execute_fetchall(
+            "SELECT thread_id FROM chat_sessions WHERE chat_id = ?",
+            (chat_id,),
+        )
+        if not rows:
+            return None
+        thread_id = str(next(iter(rows))[0])
+        self._cache_thread(chat_id, thread_id)
+        return thread_id
 
     async def set_thread_for_chat(self, chat_id: str, thread_id: str) -> None:
         """Set the thread ID for a chat."""
         now = int(time.time())
-        async with aiosqlite.connect(self._path) as db:
-            await db.execute(
-                """
-                INSERT INTO chat_sessions(chat_id, thread_id, updated_at)
-                VALUES(?, ?, ?)
-                ON CONFLICT(chat_id) DO UPDATE SET
-                    thread_id = excluded.thread_id,
-                    updated_at = excluded.updated_at
-                """,
-                (chat_id, thread_id, now),
-            )
-            await db.commit()
+        db = self._connection()
+        await db.execute(
+            """
+            INSERT INTO chat_sessions(chat_id, thread_id, updated_at)
+            VALUES(?, ?, ?)
+            ON CONFLICT(chat_id) DO UPDATE SET
+                thread_id = excluded.thread_id,
+                updated_at = excluded.updated_at
+            """,
+            (chat_id, thread_id, now),
+        )
+        self._cache_thread(chat_id, thread_id)
+
+    def _cache_thread(self, chat_id: str, thread_id: str) -> None:
+        """Remember a chat's thread ID, evicting the least recently used entry."""
+        self._thread_cache[chat_id] = thread_id
+        self._thread_cache.move_to_end(chat_id)
+        if len(self._thread_cache) > _MAX_CACHED_THREADS:
+            self._thread_cache.popitem(last=False)
 
     async def set_pending_login(
         self,
@@ -88,58 +131,68 @@ class SessionStore:
     ) -> None:
         """Store pending login state."""
         now = int(time.time())
-        async with aiosqlite.connect(self._path) as db:
-            await db.execute(
-                """
-                INSERT INTO auth_login_state(
-                    id, login_id, auth_url, expected_redirect_uri, updated_at
-                )
-                VALUES(1, ?, ?, ?, ?)
-                ON CONFLICT(id) DO UPDATE SET
-                    login_id = excluded.login_id,
-                    auth_url = excluded.auth_url,
-                    expected_redirect_uri = excluded.expected_redirect_uri,
-                    updated_at = excluded.updated_at
-                """,
-                (login_id, auth_url, expected_redirect_uri, now),
+        db = self._connection()
+        await db.execute(
+            """
+            INSERT INTO auth_login_state(
+                id, login_id, auth_url, expected_redirect_uri, updated_at
             )
-            await db.commit()
+            VALUES(1, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                login_id = excluded.login_id,
+                auth_url = excluded.auth_url,
+                expected_redirect_uri = excluded.expected_redirect_uri,
+                updated_at = excluded.updated_at
+            """,
+            (login_id, auth_url, expected_redirect_uri, now),
+        )
+        self._pending_login = _pending_login_from_row(login_id, auth_url, expected_redirect_uri)
 
     async def clear_pending_login(self) -> None:
         """Clear pending login state."""
         now = int(time.time())
-        async with aiosqlite.connect(self._path) as db:
-            await db.execute(
-                """
-                INSERT INTO auth_login_state(
-                    id, login_id, auth_url, expected_redirect_uri, updated_at
-                )
-                VALUES(1, NULL, NULL, NULL, ?)
-                ON CONFLICT(id) DO UPDATE SET
-                    login_id = NULL,
-                    auth_url = NULL,
-                    expected_redirect_uri = NULL,
-                    updated_at = excluded.updated_at
-                """,
-                (now,),
+        db = self._connection()
+        await db.execute(
+            """
+            INSERT INTO auth_login_state(
+                id, login_id, auth_url, expected_redirect_uri, updated_at
             )
-            await db.commit()
+            VALUES(1, NULL, NULL, NULL, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                login_id = NULL,
+                auth_url = NULL,
+                expected_redirect_uri = NULL,
+                updated_at = excluded.updated_at
+            """,
+            (now,),
+        )
+        self._pending_login = None
 
     async def get_pending_login(self) -> PendingLogin | None:
         """Get pending login state, or None if not found."""
-        async with aiosqlite.connect(self._path) as db:
-            cursor = await db.execute(
-                """
-                SELECT login_id, auth_url, expected_redirect_uri
-                FROM auth_login_state
-                WHERE id = 1
-                """
-            )
-            row = await cursor.fetchone()
-            if not row or not row[0]:
-                return None
-            return PendingLogin(
-                login_id=str(row[0]),
-                auth_url=str(row[1]) if row[1] else None,
-                expected_redirect_uri=str(row[2]) if row[2] else None,
-            )
+        return self._pending_login
+
+    async def _load_pending_login(self, db: aiosqlite.Connection) -> PendingLogin | None:
+        """Read pending login state from the database."""
+        rows = await db.execute_fetchall(
+            """
+            SELECT login_id, auth_url, expected_redirect_uri
+            FROM auth_login_state
+            WHERE id = 1
+            """
+        )
+        row = next(iter(rows), None)
+        if not row:
+            return None
+        return _pending_login_from_row(row[0], row[1], row[2])
+
+
+def _pending_login_from_row(login_id: object, auth_url: object, expected_redirect_uri: object) -> PendingLogin | None:
+    """Build pending login state, treating an empty login id as none and empty URLs as missing."""
+    if not login_id:
+        return None
+    return PendingLogin(
+        login_id=str(login_id),
+        auth_url=str(auth_url) if auth_url else None,
+        expected_redirect_uri=str(expected_redirect_uri) if expected_redirect_uri else None,
+    )
@@ -10,8 +10,9 @@ class WhatsAppSidecarClient:
 
     def __init__(self, base_url: str, shared_secret: str | None = None) -> None:
         self._base_url = base_url.rstrip("/")
-        self._shared_secret = shared_secret
-        self._client = httpx.AsyncClient(timeout=20)
+        self._send_url = f"{self._base_url}/send"
+        headers = {"x-sidecar-secret": shared_secret} if shared_secret else None
+        self._client = httpx.AsyncClient(timeout=20, headers=headers)
 
     async def close(self) -> None:
         """Close the HTTP client."""
@@ -19,13 +20,14 @@ class WhatsAppSidecarClient:
 
     async def send_text(self, to: str, text: str) -> None:
         """Send a text message through the sidecar."""
-        headers: dict[str, str] = {}
-        if self._shared_secret:
-            headers["x-sidecar-secret"] = self._shared_secret
-
-        response = await self._client.post(
-            f"{self._base_url}/send",
-            json={"to": to, "text": text},
-            headers=headers,
-        )
+        response = await self._client.post(self._send_url, json={"to": to, "text": text})
         response.raise_for_status()
+
+    async def send_texts(self, to: str, texts: list[str]) -> None:
+        """Send several text messages through the sidecar, preserving their order.
+
+        The sidecar delivers each /send request independently, so chunks are sent one
+        at a time; overlapping requests could reach WhatsApp out of order.
+        """
+        for text in texts:
+            await self.send_text(to, text)
@@ -0,0 +1,26 @@
+"""Shared pytest fixtures."""
+
+from collections.abc import AsyncIterator
+
+import pytest_asyncio
+
+from app.config import Settings
+from app.main import _Container
+from app.store import SessionStore
+
+
+@pytest_asyncio.fixture
+async def store() -> AsyncIterator[SessionStore]:
+    """Open a fresh in-memory store for tests that do not need durability."""
+    session_store = SessionStore(":memory:")
+    await session_store.init()
+    yield session_store
+    await session_store.close()
+
+
+@pytest_asyncio.fixture
+async def container() -> AsyncIterator[_Container]:
+    """Build the app container without starting Codex or opening the store."""
+    built = _Container(Settings.model_validate({"DATABASE_PATH": ":memory:"}))
+    yield built
+    await built.sidecar.close()
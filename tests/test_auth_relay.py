@@ -3,6 +3,7 @@
 import httpx
 import pytest
 
+import app.auth_relay
 from app.auth_relay import (
     build_callback_replay_url,
     extract_expected_redirect_uri,
@@ -45,13 +46,18 @@ def test_build_callback_replay_url_accepts_error_params() -> None:
     assert "state=xyz" in replay
 
 
+def test_build_callback_replay_url_drops_unrelated_and_blank_params() -> None:
+    callback_url = "http://localhost:9999/auth/callback?scope=openid&code=a%2Fb+c&error_description=&state=xyz"
+    replay = build_callback_replay_url("http://127.0.0.1:1455/auth/callback", callback_url)
+    assert replay == "http://127.0.0.1:1455/auth/callback?code=a%2Fb+c&state=xyz"
+
+
 def test_build_callback_replay_url_rejects_invalid_scheme() -> None:
     callback_url = "ftp://localhost/auth/callback?code=abc&state=xyz"
     with pytest.raises(ValueError, match="Invalid callback URL"):
         build_callback_replay_url("http://127.0.0.1:1455/auth/callback", callback_url)
 
 
-@pytest.mark.asyncio
 async def test_replay_callback_to_codex_accepts_302(monkeypatch: pytest.MonkeyPatch) -> None:
     captured: dict[str, object] = {}
 
@@ -62,26 +68,18 @@ async def test_replay_callback_to_codex_accepts_302(monkeypatch: pytest.MonkeyPa
             raise AssertionError("raise_for_status should not be called for 302")
 
     class _Client:
+        is_closed = False
+
         def __init__(self, timeout: int) -> None:
             captured["timeout"] = timeout
 
-        async def __aenter__(self) -> "_Client":
-            return self
-
-        async def __aexit__(
-            self,
-            exc_type: type[BaseException] | None,
-            exc: BaseException | None,
-            tb: object,
-        ) -> bool:
-            return False
-
         async def get(self, url: str, follow_redirects: bool = False) -> _Response:
             captured["url"] = url
             captured["follow_redirects"] = follow_redirects
             return _Response()
 
-    monkeypatch.setattr("app.auth_relay.httpx.AsyncClient", _Client)
+    monkeypatch.setattr(httpx, "AsyncClient", _Client)
+    monkeypatch.setattr(app.auth_relay, "_replay_client", None)
 
     await replay_callback_to_codex("http://localhost:1455/auth/callback?code=abc&state=xyz")
 
@@ -89,7 +87,6 @@ async def test_replay_callback_to_codex_accepts_302(monkeypatch: pytest.MonkeyPa
     assert captured["follow_redirects"] is False
 
 
-@pytest.mark.asyncio
 async def test_replay_callback_to_codex_raises_on_400(monkeypatch: pytest.MonkeyPatch) -> None:
     class _Response:
         status_code = 400
@@ -100,24 +97,40 @@ async def test_replay_callback_to_codex_raises_on_400(monkeypatch: pytest.Monkey
             raise httpx.HTTPStatusError("bad request", request=request, response=response)
 
     class _Client:
+        is_closed = False
+
         def __init__(self, timeout: int) -> None:
             self.timeout = timeout
 
-        async def __aenter__(self) -> "_Client":
-            return self
-
-        async def __aexit__(
-            self,
-            exc_type: type[BaseException] | None,
-            exc: BaseException | None,
-            tb: object,
-        ) -> bool:
-            return False
-
         async def get(self, url: str, follow_redirects: bool = False) -> _Response:
             return _Response()
 
-    monkeypatch.setattr("app.auth_relay.httpx.AsyncClient", _Client)
+    monkeypatch.setattr(httpx, "AsyncClient", _Client)
+    monkeypatch.setattr(app.auth_relay, "_replay_client", None)
 
     with pytest.raises(httpx.HTTPStatusError):
         await replay_callback_to_codex("http://localhost:1455/auth/callback?code=abc&state=xyz")
+
+
+async def test_replay_callback_to_codex_reuses_client(monkeypatch: pytest.MonkeyPatch) -> None:
+    created: list[object] = []
+
+    class _Response:
+        status_code = 200
+
+    class _Client:
+        is_closed = False
+
+        def __init__(self, timeout: int) -> None:
+            created.append(self)
+
+        async def get(self, url: str, follow_redirects: bool = False) -> _Response:
+            return _Response()
+
+    monkeypatch.setattr(httpx, "AsyncClient", _Client)
+    monkeypatch.setattr(app.auth_relay, "_replay_client", None)
+
+    await replay_callback_to_codex("http://localhost:1455/auth/callback?code=abc&state=xyz")
+    await replay_callback_to_codex("http://localhost:1455/auth/callback?code=def&state=xyz")
+
+    assert len(created) == 1
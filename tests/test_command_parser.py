@@ -37,3 +37,39 @@ def test_parse_command_with_whitespace() -> None:
     assert parsed is not None
     assert parsed.name == "sessions"
     assert parsed.args == "5"
+
+
+def test_parse_command_with_newline_separator() -> None:
+    parsed = parse_slash_command("/new\nmy topic")
+    assert parsed is not None
+    assert parsed.name == "new"
+    assert parsed.args == "my topic"
+
+
+def test_parse_command_keeps_non_word_names() -> None:
+    parsed = parse_slash_command("/auth-status now")
+    assert parsed is not None
+    assert parsed.name == "auth-status"
+    assert parsed.args == "now"
+
+
+def test_parse_command_allows_space_after_slash() -> None:
+    parsed = parse_slash_command("/ help")
+    assert parsed is not None
+    assert parsed.name == "help"
+    assert parsed.args == ""
+
+
+def test_parse_command_splits_subcommand() -> None:
+    parsed = parse_slash_command("/auth COMPLETE  https://example.com/cb?code=a b ")
+    assert parsed is not None
+    assert parsed.name == "auth"
+    assert parsed.subcommand == "complete"
+    assert parsed.rest == "https://example.com/cb?code=a b"
+
+
+def test_parse_command_without_args_has_empty_subcommand() -> None:
+    parsed = parse_slash_command("/auth")
+    assert parsed is not None
+    assert parsed.subcommand == ""
+    assert parsed.rest == ""
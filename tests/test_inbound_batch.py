@@ -0,0 +1,84 @@
+"""Tests for coalescing queued inbound messages into one turn."""
+
+import asyncio
+
+import pytest
+
+from app.main import _Container, _process_inbound, _take_inbound_batch
+from app.models import ChatResponse, InboundMessage
+
+
+class _FakeServiceForBatch:
+    def __init__(self) -> None:
+        self.turns: list[tuple[str, str]] = []
+        self.release_first = asyncio.Event()
+
+    async def handle_message(self, chat_id: str, text: str) -> ChatResponse:
+        self.turns.append((chat_id, text))
+        if len(self.turns) == 1:
+            await self.release_first.wait()
+        return ChatResponse(text=f"reply to {text}")
+
+
+class _FakeSidecarForBatch:
+    def __init__(self) -> None:
+        self.sent: list[tuple[str, list[str]]] = []
+
+    async def send_texts(self, to: str, texts: list[str]) -> None:
+        self.sent.append((to, texts))
+
+
+def _self_chat_message(text: str) -> InboundMessage:
+    return InboundMessage.model_validate(
+        {"from": "12345@s.whatsapp.net", "text": text, "self_jid": "12345:3@s.whatsapp.net"}
+    )
+
+
+def test_take_inbound_batch_joins_queued_plain_messages() -> None:
+    pending = {"chat-1": [("to-1", "first"), ("to-1", "second")]}
+
+    assert _take_inbound_batch(pending, "chat-1") == ("to-1", "first\nsecond")
+    assert pending == {}
+
+
+def test_take_inbound_batch_returns_none_when_already_consumed() -> None:
+    assert _take_inbound_batch({}, "chat-1") is None
+
+
+def test_take_inbound_batch_handles_commands_alone() -> None:
+    pending = {"chat-1": [("to-1", "/new"), ("to-1", "hello"), ("to-1", "/help")]}
+
+    assert _take_inbound_batch(pending, "chat-1") == ("to-1", "/new")
+    assert _take_inbound_batch(pending, "chat-1") == ("to-1", "hello")
+    assert _take_inbound_batch(pending, "chat-1") == ("to-1", "/help")
+    assert _take_inbound_batch(pending, "chat-1") is None
+
+
+def test_take_inbound_batch_splits_on_reply_target() -> None:
+    pending = {"chat-1": [("to-1", "a"), ("to-2", "b")]}
+
+    assert _take_inbound_batch(pending, "chat-1") == ("to-1", "a")
+    assert _take_inbound_batch(pending, "chat-1") == ("to-2", "b")
+
+
+async def test_process_inbound_joins_messages_queued_while_chat_is_busy(
+    container: _Container, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    service = _FakeServiceForBatch()
+    sidecar = _FakeSidecarForBatch()
+    monkeypatch.setattr(container, "service", service)
+    monkeypatch.setattr(container, "sidecar", sidecar)
+
+    busy = asyncio.create_task(_process_inbound(_self_chat_message("first"), container))
+    await asyncio.sleep(0)
+    queued = [asyncio.create_task(_process_inbound(_self_chat_message(text), container)) for text in ("a", "b")]
+    await asyncio.sleep(0)
+    service.release_first.set()
+    await asyncio.gather(busy, *queued)
+
+    assert service.turns == [("12345@s.whatsapp.net", "first"), ("12345@s.whatsapp.net", "a\nb")]
+    assert sidecar.sent == [
+        ("12345@s.whatsapp.net", ["reply to first"]),
+        ("12345@s.whatsapp.net", ["reply to a\nb"]),
+    ]
+    assert container.pending_inbound == {}
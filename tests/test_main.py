@@ -0,0 +1,196 @@
+"""Tests for the FastAPI app container and inbound endpoint."""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main
+from app.codex_client import CodexAppServerClient
+from app.config import Settings
+from app.main import _Container, _process_inbound
+from app.models import InboundMessage
+
+_InboundClient = tuple[TestClient, list[InboundMessage]]
+
+
+@pytest.fixture
+def inbound_client(container: _Container, monkeypatch: pytest.MonkeyPatch) -> _InboundClient:
+    processed: list[InboundMessage] = []
+
+    async def _fake_process(payload: InboundMessage, _: _Container) -> None:
+        processed.append(payload)
+
+    container.settings.sidecar_shared_secret = "s3cret"
+    monkeypatch.setattr(app.main.app.state, "container", container, raising=False)
+    monkeypatch.setattr(app.main, "_process_inbound", _fake_process)
+    return TestClient(app.main.app, headers={"X-Sidecar-Secret": "s3cret"}), processed
+
+
+async def test_lifespan_closes_store_when_codex_fails_to_start(monkeypatch: pytest.MonkeyPatch) -> None:
+    settings = Settings.model_validate({"DATABASE_PATH": ":memory:"})
+
+    async def _fail_start(self: CodexAppServerClient) -> None:
+        raise FileNotFoundError("codex")
+
+    monkeypatch.setattr(app.main, "get_settings", lambda: settings)
+    monkeypatch.setattr(CodexAppServerClient, "start", _fail_start)
+    monkeypatch.setattr(app.main.app.state, "container", None, raising=False)
+
+    with pytest.raises(FileNotFoundError):
+        async with app.main.lifespan(app.main.app):
+            pass
+
+    container: _Container = app.main.app.state.container
+    try:
+        with pytest.raises(RuntimeError):
+            container.store._connection()
+    finally:
+        await container.store.close()
+        await container.sidecar.close()
+
+
+async def test_get_chat_lock_reuses_lock_for_chat(container: _Container) -> None:
+    first = container.get_chat_lock("chat-1")
+
+    assert container.get_chat_lock("chat-1") is first
+
+
+async def test_get_chat_lock_evicts_idle_chats_but_keeps_busy_ones(
+    container: _Container, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(app.main, "_MAX_CHAT_LOCKS", 3)
+    release_holder = asyncio.Event()
+    waiter_entered = asyncio.Event()
+
+    async def _hold() -> None:
+        async with container.chat_turn("busy"):
+            await release_holder.wait()
+
+    async def _wait() -> None:
+        async with container.chat_turn("busy"):
+            waiter_entered.set()
+
+    holder = asyncio.create_task(_hold())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(_wait())
+    await asyncio.sleep(0)
+    container.get_chat_lock("idle")
+    container.get_chat_lock("other")
+
+    container.get_chat_lock("new")
+    assert list(container.chat_locks) == ["busy", "other", "new"]
+
+    # Between release() and the woken waiter running, the lock reports unlocked.
+    release_holder.set()
+    await asyncio.sleep(0)
+    assert holder.done()
+    assert not waiter_entered.is_set()
+    assert not container.chat_locks["busy"].locked()
+    busy_lock = container.chat_locks["busy"]
+    container.get_chat_lock("newer")
+    assert list(container.chat_locks) == ["busy", "new", "newer"]
+
+    await waiter
+    assert container.chat_locks["busy"] is busy_lock
+    assert container.chat_inflight == {}
+
+
+async def test_self_identity_is_memoized_per_jid(container: _Container) -> None:
+    assert container.self_identity("12345:17@s.whatsapp.net") == "12345"
+    assert container._self_identity_cache == ("12345:17@s.whatsapp.net", "12345")
+    assert container.self_identity("12345:17@s.whatsapp.net") == "12345"
+
+    assert container.self_identity("67890@s.whatsapp.net") == "67890"
+    assert container._self_identity_cache == ("67890@s.whatsapp.net", "67890")
+
+
+@pytest.mark.parametrize(
+    ("access_mode", "is_group"),
+    [("approved_senders", False), ("self_chat", True)],
+    ids=["approved-senders", "group"],
+)
+async def test_rejected_inbound_skips_self_identity(container: _Container, access_mode: str, is_group: bool) -> None:
+    container.whatsapp_access_mode = access_mode
+    payload = InboundMessage.model_validate(
+        {"from": "12345@s.whatsapp.net", "text": "hi", "is_group": is_group, "self_jid": "12345@s.whatsapp.net"}
+    )
+
+    await _process_inbound(payload, container)
+
+    assert container._self_identity_cache is None
+    assert container.chat_locks == {}
+
+
+def test_inbound_rejects_wrong_secret(inbound_client: _InboundClient) -> None:
+    client, processed = inbound_client
+
+    response = client.post("/whatsapp/inbound", json={"from": "x"}, headers={"X-Sidecar-Secret": "nope"})
+
+    assert response.status_code == 401
+    assert processed == []
+
+
+def test_inbound_reports_invalid_json_under_body(inbound_client: _InboundClient) -> None:
+    client, _ = inbound_client
+
+    response = client.post("/whatsapp/inbound", content=b"{bad", headers={"Content-Type": "application/json"})
+
+    assert response.status_code == 422
+    [error] = response.json()["detail"]
+    assert error["type"] == "json_invalid"
+    assert error["loc"] == ["body"]
+    assert error["input"] == {}
+
+
+@pytest.mark.parametrize("content_type", ["text/plain", None])
+def test_inbound_rejects_non_json_content_type(inbound_client: _InboundClient, content_type: str | None) -> None:
+    client, processed = inbound_client
+    headers = {"Content-Type": content_type} if content_type else {}
+
+    response = client.post(
+        "/whatsapp/inbound", content=b'{"from": "12345@s.whatsapp.net", "text": "hi"}', headers=headers
+    )
+
+    assert response.status_code == 422
+    [error] = response.json()["detail"]
+    assert error["type"] == "model_attributes_type"
+    assert error["loc"] == ["body"]
+    assert processed == []
+
+
+def test_inbound_reports_missing_field_like_fastapi(inbound_client: _InboundClient) -> None:
+    client, processed = inbound_client
+
+    response = client.post("/whatsapp/inbound", json={"from": "12345@s.whatsapp.net"})
+
+    assert response.status_code == 422
+    [error] = response.json()["detail"]
+    assert error["type"] == "missing"
+    assert error["loc"] == ["body", "text"]
+    assert "url" not in error
+    assert processed == []
+
+
+def test_inbound_accepts_valid_payload(inbound_client: _InboundClient) -> None:
+    client, processed = inbound_client
+
+    response = client.post(
+        "/whatsapp/inbound",
+        content=b'{"from": "12345@s.whatsapp.net", "text": "hi"}',
+        headers={"Content-Type": "application/json; charset=utf-8"},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"accepted": True}
+    assert [(payload.from_id, payload.text) for payload in processed] == [("12345@s.whatsapp.net", "hi")]
+
+
+def test_inbound_request_body_is_documented() -> None:
+    schema = app.main.app.openapi()
+
+    request_body = schema["paths"]["/whatsapp/inbound"]["post"]["requestBody"]
+    body_schema = request_body["content"]["application/json"]["schema"]
+    assert request_body["required"] is True
+    assert body_schema["required"] == ["from", "text"]
+    assert set(body_schema["properties"]) == set(InboundMessage.model_json_schema(by_alias=True)["properties"])
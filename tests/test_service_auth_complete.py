@@ -1,142 +1,164 @@
 """Tests for auth command handling in ChatService."""
 
-from typing import Any
+import asyncio
+from dataclasses import dataclass
+from typing import Any, ClassVar
 
 import pytest
 
+import app.service
 from app.service import ChatService
 from app.store import SessionStore
 
+_REDIRECT_URI = "http://localhost:1455/auth/callback"
+_AUTH_URL = "https://chatgpt.com/login?redirect_uri=http%3A%2F%2Flocalhost%3A1455%2Fauth%2Fcallback"
+_CALLBACK_URL = f"{_REDIRECT_URI}?code=abc&state=xyz"
+_FINAL_URL = "https://example.com/final?code=abc&state=xyz"
+
 
 class _FakeCodexForAuth:
+    __slots__ = ("account_reads", "refresh_reads", "restart_calls", "signed_in", "hidden_reads")
+
+    _SIGNED_IN: ClassVar[dict[str, Any]] = {
+        "account": {"type": "chatgpt", "email": "user@example.com", "planType": "pro"},
+        "requiresOpenaiAuth": True,
+    }
+    _SIGNED_OUT: ClassVar[dict[str, Any]] = {"account": None, "requiresOpenaiAuth": True}
+
     def __init__(self) -> None:
         self.account_reads = 0
-        self.refresh_flags: list[bool] = []
+        self.refresh_reads = 0
         self.restart_calls = 0
+        self.signed_in = True
+        self.hidden_reads = 0
 
     async def account_read(self, refresh_token: bool = False) -> dict[str, Any]:
         self.account_reads += 1
-        self.refresh_flags.append(refresh_token)
-        return {
-            "account": {"type": "chatgpt", "email": "user@example.com", "planType": "pro"},
-            "requiresOpenaiAuth": True,
-        }
+        self.refresh_reads += refresh_token
+        if self.signed_in and self.account_reads > self.hidden_reads:
+            return self._SIGNED_IN
+        return self._SIGNED_OUT
 
     async def restart(self) -> None:
         self.restart_calls += 1
 
 
-@pytest.mark.asyncio
-async def test_auth_complete_requires_pending_login(tmp_path: Any) -> None:
-    store = SessionStore(tmp_path / "state.db")
-    await store.init()
-    service = ChatService(store=store, codex=_FakeCodexForAuth())  # type: ignore[arg-type]
+@dataclass
+class _AuthServiceContext:
+    store: SessionStore
+    codex: _FakeCodexForAuth
+    service: ChatService
 
-    response = await service.handle_message(
-        "chat-1",
-        "/auth complete http://localhost:1455/auth/callback?code=abc&state=xyz",
-    )
 
-    assert "No pending login found" in response.text
+@dataclass
+class _VirtualClock:
+    now: float = 0.0
 
 
-@pytest.mark.asyncio
-async def test_auth_complete_replays_callback_and_clears_pending(
-    tmp_path: Any, monkeypatch: pytest.MonkeyPatch
-) -> None:
-    store = SessionStore(tmp_path / "state.db")
-    await store.init()
-    await store.set_pending_login(
-        login_id="login-1",
-        auth_url="https://chatgpt.com/login?redirect_uri=http%3A%2F%2Flocalhost%3A1455%2Fauth%2Fcallback",
-        expected_redirect_uri="http://localhost:1455/auth/callback",
-    )
+@pytest.fixture(autouse=True)
+def virtual_clock(monkeypatch: pytest.MonkeyPatch) -> _VirtualClock:
+    """Point app.service's clock hooks at a virtual clock whose sleeps return at once."""
+    clock = _VirtualClock()
+
+    async def _sleep(delay: float) -> None:
+        clock.now += delay
+        await asyncio.sleep(0)
+
+    monkeypatch.setattr(app.service, "_sleep", _sleep)
+    monkeypatch.setattr(app.service, "_monotonic", lambda: clock.now)
+    return clock
 
-    captured: dict[str, str | None] = {"url": None}
+
+@pytest.fixture(autouse=True)
+def replayed_urls(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    urls: list[str] = []
 
     async def _fake_replay(url: str) -> None:
-        captured["url"] = url
+        urls.append(url)
+
+    monkeypatch.setattr(app.service, "replay_callback_to_codex", _fake_replay)
+    return urls
 
-    monkeypatch.setattr("app.service.replay_callback_to_codex", _fake_replay)
 
+@pytest.fixture
+def service_ctx(store: SessionStore) -> _AuthServiceContext:
     codex = _FakeCodexForAuth()
     service = ChatService(store=store, codex=codex)  # type: ignore[arg-type]
-    response = await service.handle_message(
+    return _AuthServiceContext(store=store, codex=codex, service=service)
+
+
+async def test_auth_complete_requires_pending_login(service_ctx: _AuthServiceContext) -> None:
+    response = await service_ctx.service.handle_message(
         "chat-1",
-        "/auth complete https://example.com/final?code=abc&state=xyz",
+        f"/auth complete {_CALLBACK_URL}",
     )
 
-    assert captured["url"] == "http://localhost:1455/auth/callback?code=abc&state=xyz"
-    assert "Sign-in completed: chatgpt" in response.text
-    assert codex.restart_calls == 1
-    assert True in codex.refresh_flags
-    assert await store.get_pending_login() is None
+    assert "No pending login found" in response.text
 
 
-@pytest.mark.asyncio
-async def test_auth_complete_shows_delay_hint_when_auth_not_visible(
-    tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+@pytest.mark.parametrize(
+    ("signed_in", "hidden_reads", "expected_text", "expected_reads", "login_cleared"),
+    [
+        (True, 0, "Sign-in completed: chatgpt (user@example.com, plan=pro)", 1, True),
+        (True, 2, "Sign-in completed: chatgpt (user@example.com, plan=pro)", 3, True),
+        (False, 0, "Callback relayed; auth may be delayed, run /auth status in 10-20s.", 9, False),
+    ],
+    ids=["immediate", "after-polling", "not-visible"],
+)
+async def test_auth_complete_replays_callback_and_polls_for_login(
+    service_ctx: _AuthServiceContext,
+    replayed_urls: list[str],
+    signed_in: bool,
+    hidden_reads: int,
+    expected_text: str,
+    expected_reads: int,
+    login_cleared: bool,
 ) -> None:
-    store = SessionStore(tmp_path / "state.db")
-    await store.init()
+    store, codex, service = service_ctx.store, service_ctx.codex, service_ctx.service
     await store.set_pending_login(
         login_id="login-1",
-        auth_url="https://chatgpt.com/login?redirect_uri=http%3A%2F%2Flocalhost%3A1455%2Fauth%2Fcallback",
-        expected_redirect_uri="http://localhost:1455/auth/callback",
+        auth_url=_AUTH_URL,
+        expected_redirect_uri=_REDIRECT_URI,
     )
-
-    async def _fake_replay(_: str) -> None:
-        return None
-
-    monkeypatch.setattr("app.service.replay_callback_to_codex", _fake_replay)
-
-    codex = _FakeCodexForAuth()
-    service = ChatService(store=store, codex=codex)  # type: ignore[arg-type]
-
-    async def _no_auth(
-        timeout_seconds: float = 12,
-        interval_seconds: float = 0.6,
-    ) -> None:
-        return None
-
-    monkeypatch.setattr(service, "_wait_for_chatgpt_login", _no_auth)
+    codex.signed_in = signed_in
+    codex.hidden_reads = hidden_reads
 
     response = await service.handle_message(
         "chat-1",
-        "/auth complete https://example.com/final?code=abc&state=xyz",
+        f"/auth complete {_FINAL_URL}",
     )
 
-    assert response.text == "Callback relayed; auth may be delayed, run /auth status in 10-20s."
+    assert replayed_urls == [_CALLBACK_URL]
+    assert response.text == expected_text
     assert codex.restart_calls == 1
-    assert await store.get_pending_login() is not None
+    assert codex.account_reads == codex.refresh_reads == expected_reads
+    assert (await store.get_pending_login() is None) is login_cleared
 
 
-@pytest.mark.asyncio
-async def test_auth_status_uses_refresh_token(tmp_path: Any) -> None:
-    store = SessionStore(tmp_path / "state.db")
-    await store.init()
-    codex = _FakeCodexForAuth()
-    service = ChatService(store=store, codex=codex)  # type: ignore[arg-type]
+async def test_auth_status_uses_refresh_token(service_ctx: _AuthServiceContext) -> None:
+    codex, service = service_ctx.codex, service_ctx.service
 
     response = await service.handle_message("chat-1", "/auth status")
 
     assert response.text.startswith("Auth: chatgpt")
-    assert codex.refresh_flags == [True]
+    assert codex.account_reads == codex.refresh_reads == 1
 
 
-@pytest.mark.asyncio
-async def test_auth_status_shows_login_hint_when_account_missing(tmp_path: Any) -> None:
-    class _NoAccountCodex(_FakeCodexForAuth):
-        async def account_read(self, refresh_token: bool = False) -> dict[str, Any]:
-            self.account_reads += 1
-            self.refresh_flags.append(refresh_token)
-            return {"account": None, "requiresOpenaiAuth": True}
+async def test_auth_status_shows_login_hint_when_account_missing(service_ctx: _AuthServiceContext) -> None:
+    service_ctx.codex.signed_in = False
 
-    store = SessionStore(tmp_path / "state.db")
-    await store.init()
-    codex = _NoAccountCodex()
-    service = ChatService(store=store, codex=codex)  # type: ignore[arg-type]
-
-    response = await service.handle_message("chat-1", "/auth status")
+    response = await service_ctx.service.handle_message("chat-1", "/auth status")
 
     assert response.text == "Auth: not logged in. Run /auth login and try again."
+
+
+async def test_concurrent_auth_status_shares_one_account_read(service_ctx: _AuthServiceContext) -> None:
+    codex, service = service_ctx.codex, service_ctx.service
+
+    first, second = await asyncio.gather(
+        service.handle_message("chat-1", "/auth status"),
+        service.handle_message("chat-2", "/auth status"),
+    )
+
+    assert first.text == second.text
+    assert codex.account_reads == 1
@@ -0,0 +1,58 @@
+"""Tests for slash command handling in ChatService."""
+
+from typing import Any
+
+from app.service import ChatService
+from app.store import SessionStore
+
+
+class _FakeCodexForCommands:
+    def __init__(self, threads: list[dict[str, Any]]) -> None:
+        self.threads = threads
+        self.list_limits: list[int] = []
+        self.resumed: list[str] = []
+
+    async def thread_list(self, limit: int = 10) -> list[dict[str, Any]]:
+        self.list_limits.append(limit)
+        return self.threads[:limit]
+
+    async def thread_resume(self, thread_id: str) -> dict[str, Any]:
+        self.resumed.append(thread_id)
+        return {"id": thread_id}
+
+
+async def test_help_lists_commands(store: SessionStore) -> None:
+    service = ChatService(store=store, codex=_FakeCodexForCommands([]))  # type: ignore[arg-type]
+
+    response = await service.handle_message("chat-1", "/help")
+
+    assert response.text.startswith("Available commands:\n/new [title]")
+
+
+async def test_unknown_command_points_to_help(store: SessionStore) -> None:
+    service = ChatService(store=store, codex=_FakeCodexForCommands([]))  # type: ignore[arg-type]
+
+    response = await service.handle_message("chat-1", "/nope")
+
+    assert response.text == "Unknown command. Send /help."
+
+
+async def test_sessions_lists_threads_with_previews(store: SessionStore) -> None:
+    codex = _FakeCodexForCommands([{"id": "thr-1", "preview": " first\r\nline\tthree "}, {"id": "thr-2"}])
+    service = ChatService(store=store, codex=codex)  # type: ignore[arg-type]
+
+    response = await service.handle_message("chat-1", "/sessions 2")
+
+    assert response.text == "Sessions:\n1. `thr-1` — first  line three\n2. `thr-2`"
+
+
+async def test_resume_by_index_switches_chat_thread(store: SessionStore) -> None:
+    codex = _FakeCodexForCommands([{"id": "thr-1"}, {"id": "thr-2"}])
+    service = ChatService(store=store, codex=codex)  # type: ignore[arg-type]
+
+    response = await service.handle_message("chat-1", "/resume 2")
+
+    assert response.text == "Resumed session: `thr-2`"
+    assert codex.resumed == ["thr-2"]
+    assert codex.list_limits == [2]
+    assert await store.get_thread_for_chat("chat-1") == "thr-2"
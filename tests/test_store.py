@@ -0,0 +1,130 @@
+"""Tests for SQLite session persistence."""
+
+from typing import Any
+
+import pytest
+
+from app.models import PendingLogin
+from app.store import SessionStore
+
+
+async def test_store_uses_wal_journal(tmp_path: Any) -> None:
+    store = SessionStore(tmp_path / "state.db")
+    await store.init()
+    try:
+        db = store._connection()
+        cursor = await db.execute("PRAGMA journal_mode")
+        row = await cursor.fetchone()
+        assert row is not None
+        assert row[0] == "wal"
+    finally:
+        await store.close()
+
+
+async def test_thread_for_chat_round_trips_and_survives_reopen(tmp_path: Any) -> None:
+    store = SessionStore(tmp_path / "state.db")
+    await store.init()
+    assert await store.get_thread_for_chat("chat-1") is None
+    await store.set_thread_for_chat("chat-1", "thr-1")
+    await store.set_thread_for_chat("chat-1", "thr-2")
+    assert await store.get_thread_for_chat("chat-1") == "thr-2"
+    await store.close()
+
+    reopened = SessionStore(tmp_path / "state.db")
+    await reopened.init()
+    try:
+        assert await reopened.get_thread_for_chat("chat-1") == "thr-2"
+    finally:
+        await reopened.close()
+
+
+async def test_pending_login_is_restored_after_reopen(tmp_path: Any) -> None:
+    store = SessionStore(tmp_path / "state.db")
+    await store.init()
+    await store.set_pending_login(
+        login_id="login-1",
+        auth_url="https://chatgpt.com/login",
+        expected_redirect_uri="http://localhost:1455/auth/callback",
+    )
+    await store.close()
+
+    reopened = SessionStore(tmp_path / "state.db")
+    await reopened.init()
+    try:
+        pending = await reopened.get_pending_login()
+        assert pending is not None
+        assert pending.login_id == "login-1"
+        assert pending.expected_redirect_uri == "http://localhost:1455/auth/callback"
+
+        await reopened.clear_pending_login()
+        assert await reopened.get_pending_login() is None
+    finally:
+        await reopened.close()
+
+
+async def test_init_adds_missing_auth_login_columns(tmp_path: Any) -> None:
+    path = tmp_path / "state.db"
+    legacy = SessionStore(path)
+    await legacy.init()
+    db = legacy._connection()
+    await db.executescript(
+        """
+        DROP TABLE auth_login_state;
+        CREATE TABLE auth_login_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            login_id TEXT,
+            updated_at INTEGER NOT NULL
+        );
+        """
+    )
+    await legacy.close()
+
+    store = SessionStore(path)
+    await store.init()
+    try:
+        await store.set_pending_login(login_id="login-1", auth_url="https://a", expected_redirect_uri=None)
+        cursor = await store._connection().execute("SELECT auth_url FROM auth_login_state WHERE id = 1")
+        assert await cursor.fetchone() == ("https://a",)
+    finally:
+        await store.close()
+
+
+async def test_in_memory_store_round_trips_without_touching_disk(
+    tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    store = SessionStore(":memory:")
+    await store.init()
+    try:
+        await store.set_thread_for_chat("chat-1", "thr-1")
+        assert await store.get_thread_for_chat("chat-1") == "thr-1"
+        assert list(tmp_path.iterdir()) == []
+    finally:
+        await store.close()
+
+
+@pytest.mark.parametrize(
+    ("login_id", "auth_url", "expected"),
+    [
+        ("login-1", "", PendingLogin(login_id="login-1")),
+        ("", "https://a", None),
+    ],
+    ids=["blank-urls", "blank-login-id"],
+)
+async def test_cached_pending_login_matches_reloaded_state(
+    tmp_path: Any, login_id: str, auth_url: str, expected: PendingLogin | None
+) -> None:
+    store = SessionStore(tmp_path / "state.db")
+    await store.init()
+    try:
+        await store.set_pending_login(login_id=login_id, auth_url=auth_url, expected_redirect_uri="")
+        assert await store.get_pending_login() == expected
+    finally:
+        await store.close()
+
+    reopened = SessionStore(tmp_path / "state.db")
+    await reopened.init()
+    try:
+        assert await reopened.get_pending_login() == expected
+    finally:
+        await reopened.close()